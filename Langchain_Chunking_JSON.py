@@ -1,20 +1,63 @@
 import os
-import json
+import orjson
+import codecs
+import asyncio
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
-def markdown_to_json(md_file_path, output_json_path, chunk_size=512, chunk_overlap=50):
+# ✅ Memoize splitters so batch runs build each configuration only once
+_SPLITTER_CACHE = {}
+
+
+def _get_splitter(chunk_size, chunk_overlap):
+    """Return a cached RecursiveCharacterTextSplitter for the given sizes."""
+    key = (chunk_size, chunk_overlap)
+    if key not in _SPLITTER_CACHE:
+        _SPLITTER_CACHE[key] = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            keep_separator=False,
+            is_separator_regex=False
+        )
+    return _SPLITTER_CACHE[key]
+
+
+def _iter_chunks(md_file_path, text_splitter, chunk_size, chunk_overlap, window_size):
+    """Yield chunks lazily from the Markdown file, one read window at a time."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    tail = ""
+    with open(md_file_path, "rb", buffering=window_size) as f:
+        while True:
+            raw = f.read(window_size)
+            text = tail + decoder.decode(raw, final=not raw)
+            if raw:
+                # Keep a tail so chunks spanning window boundaries stay intact
+                cut = max(len(text) - (chunk_size + chunk_overlap), 0)
+                pending, tail = text[:cut], text[cut:]
+            else:
+                pending, tail = text, ""
+            yield from text_splitter.split_text(pending)
+            if not raw:
+                break
+
+
+def markdown_to_json(md_file_path, output_json_path, chunk_size=512, chunk_overlap=50, window_size=1 << 20):
     """
-    Reads a Markdown (.md) file, chunks the text using LangChain's RecursiveCharacterTextSplitter,
-    and converts the chunks into JSON format.
+    Reads a Markdown (.md) file in streaming windows, chunks the text using LangChain's
+    RecursiveCharacterTextSplitter, and writes the chunks to JSON incrementally.
+
+    The file is consumed in ~1 MB windows with a small tail carried between reads,
+    so peak memory stays bounded even for multi-MB filings instead of loading the
+    whole document and every splitter intermediate at once.
 
     Args:
         md_file_path (str): Path to the Markdown file.
         output_json_path (str): Path to save the output JSON file.
         chunk_size (int): The size of each chunk (default: 512).
         chunk_overlap (int): Overlapping tokens between chunks (default: 50).
+        window_size (int): Bytes read per window (default: 1 MB).
 
     Returns:
-        dict: JSON object containing the chunked Markdown text.
+        dict: Summary with the total chunk count and output path.
     """
 
     # ✅ Validate input file format
@@ -26,39 +69,62 @@ def markdown_to_json(md_file_path, output_json_path, chunk_size=512, chunk_overl
     if output_dir and not os.path.exists(output_dir):
         os.makedirs(output_dir)  # Create directories if they don't exist
 
-    # ✅ Read Markdown file
+    text_splitter = _get_splitter(chunk_size, chunk_overlap)
+    total_chunks = 0
+
+    # ✅ Pull chunks lazily from the generator and write each one as it arrives,
+    # so no full chunk list (or parallel dict list) ever materializes
     try:
-        with open(md_file_path, "r", encoding="utf-8") as f:
-            text = f.read()
+        with open(output_json_path, "w", encoding="utf-8") as json_file:
+            json_file.write('{"chunks": [')
+            for i, chunk in enumerate(_iter_chunks(md_file_path, text_splitter, chunk_size, chunk_overlap, window_size)):
+                entry = {"id": i + 1, "content": chunk}
+                json_file.write(("," if i else "") + "\n  " + orjson.dumps(entry).decode())
+                total_chunks = i + 1
+            json_file.write("\n]}")
+        print(f"✅ JSON file successfully saved at: {output_json_path}")
     except FileNotFoundError:
         raise FileNotFoundError(f"Markdown file not found: {md_file_path}")
     except Exception as e:
-        raise Exception(f"Error reading Markdown file: {str(e)}")
+        raise Exception(f"Error streaming Markdown to JSON: {str(e)}")
 
-    # ✅ Chunk the text using LangChain
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-    chunks = text_splitter.split_text(text)
+    return {"total_chunks": total_chunks, "output_json_path": output_json_path}
 
-    # ✅ Convert to JSON format
-    json_output = {"chunks": [{"id": i + 1, "content": chunk} for i, chunk in enumerate(chunks)]}
 
-    # ✅ Save JSON output to file
-    try:
-        with open(output_json_path, "w", encoding="utf-8") as json_file:
-            json.dump(json_output, json_file, indent=2, ensure_ascii=False)
-        print(f"✅ JSON file successfully saved at: {output_json_path}")
-    except Exception as e:
-        raise Exception(f"Error writing JSON file: {str(e)}")
+async def markdown_to_json_async(md_file_path, output_json_path, chunk_size=512, chunk_overlap=50, window_size=1 << 20):
+    """
+    Async variant of markdown_to_json for batch pipelines.
+
+    The streaming read/write runs in a worker thread so the asyncio event
+    loop stays free while many files are chunked concurrently.
+    """
+    return await asyncio.to_thread(
+        markdown_to_json, md_file_path, output_json_path, chunk_size, chunk_overlap, window_size
+    )
+
+
+async def process_many(files, max_concurrency=16):
+    """
+    Chunk many (md_file_path, output_json_path) pairs concurrently.
+
+    A semaphore bounds in-flight files so a large batch doesn't open
+    hundreds of file handles at once.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _worker(md_file_path, output_json_path):
+        async with semaphore:
+            return await markdown_to_json_async(md_file_path, output_json_path)
 
-    return json_output
+    return await asyncio.gather(*(_worker(md, out) for md, out in files))
 
 # Example Usage
 json_output = markdown_to_json(
-    "DOCLING_PDF_PLUMBER_Markdowns/10K10Q-Q3-2025-with-image-refs.md", 
+    "DOCLING_PDF_PLUMBER_Markdowns/10K10Q-Q3-2025-with-image-refs.md",
     output_json_path="output-json/output-q3-2025.json",  # Ensure this directory exists or will be created
-    chunk_size=512, 
+    chunk_size=512,
     chunk_overlap=50
 )
 
 # ✅ Print a preview of the output JSON
-print("\n💡 JSON Output (Preview):", json.dumps(json_output, indent=2)[:500])  # Preview first 500 characters
+print("\n💡 JSON Output (Summary):", orjson.dumps(json_output, option=orjson.OPT_INDENT_2).decode())
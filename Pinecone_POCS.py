@@ -1,30 +1,63 @@
 import os
-import json
-from pinecone import Pinecone, ServerlessSpec  
-from langchain.vectorstores import Pinecone as PineconeVectorStore
-from langchain.embeddings.huggingface import HuggingFaceEmbeddings
-from langchain.schema import Document
+import orjson
+import hashlib
+import asyncio
+import functools
 from dotenv import load_dotenv  # ✅ Import dotenv
 
 # ✅ Load .env once at the top
 load_dotenv(dotenv_path=".env")
 
 
-def index_json_content(json_content, index_name="json-index", region="us-east-1"):
+class BatchedSentenceTransformerEmbeddings:
     """
-    Index a JSON content (as string) into Pinecone after chunking.
+    Embeddings wrapper that encodes chunks in large batches, on GPU when available.
 
-    Args:
-        json_content (str): The JSON content as a string.
-        index_name (str): Name of the Pinecone index (must be lowercase, alphanumeric, and use '-' instead of '_').
-        region (str, optional): Pinecone region (default: us-east-1).
+    Normalized embeddings make cosine similarity a plain dot product, and
+    batch_size=256 keeps the model saturated instead of the default 32.
+    Implements the embed_documents/embed_query interface LangChain expects.
+    """
 
-    Returns:
-        PineconeVectorStore: The indexed Pinecone vector store.
+    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2", batch_size=256):
+        # Heavy ML stack loads only when an embedder is actually built
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.model = SentenceTransformer(model_name, device=device)
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts):
+        return self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_tensor=False,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        ).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+@functools.lru_cache(maxsize=1)
+def _get_embedder():
+    """Load the embedding model once and keep it warm for the process lifetime."""
+    return BatchedSentenceTransformerEmbeddings()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_index(index_name, region="us-east-1"):
     """
-    
-    # Ensure index name follows Pinecone rules
-    index_name = index_name.lower().replace("_", "-")  # Convert to lowercase & replace underscores
+    Build the Pinecone client once and return a cached Index handle.
+
+    Resolves the index host via describe_index so repeated calls skip the
+    control-plane round-trip and reuse the same TCP connection pool.
+    """
+    # Imported here so helpers stay importable without the Pinecone SDK;
+    # the gRPC transport multiplexes requests over one connection
+    from pinecone import ServerlessSpec
+    from pinecone.grpc import PineconeGRPC as Pinecone
 
     pinecone_api_key = os.getenv("PINECONE_API_KEY")
 
@@ -42,18 +75,102 @@ def index_json_content(json_content, index_name="json-index", region="us-east-1"
         print(f"⚠️ Index '{index_name}' not found. Creating it now...")
 
         pc.create_index(
-            name=index_name,  
+            name=index_name,
             dimension=384,  # Ensure dimension matches the embedding model
-            metric="cosine",  
-            spec=ServerlessSpec(cloud="aws", region=region)  
+            metric="cosine",
+            spec=ServerlessSpec(cloud="aws", region=region)
         )
 
-    # Retrieve the correct Pinecone Index object
-    index = pc.Index(index_name)
+    # Target the index by host to avoid a describe_index call per request
+    host = pc.describe_index(index_name).host
+    return pc.Index(host=host)
+
+
+def _vector_id(source, position):
+    """Derive a stable vector ID so re-ingesting the same file overwrites in place."""
+    return hashlib.blake2b(f"{source}|{position}".encode(), digest_size=12).hexdigest()
+
+
+def _embed_and_upsert(index, embeddings, documents, shard_size=1000):
+    """
+    Overlap embedding and upsert with a two-stage producer/consumer pipeline.
+
+    A producer embeds shards of chunks while a consumer pushes finished
+    batches to Pinecone, so upsert latency hides behind embedding work
+    instead of running after it. The bounded queue keeps at most four
+    shards in flight to cap memory.
+    """
+    async def _pipeline():
+        queue = asyncio.Queue(maxsize=4)
+
+        async def producer():
+            for start in range(0, len(documents), shard_size):
+                shard = documents[start:start + shard_size]
+                texts = [doc.page_content for doc in shard]
+                # Filings repeat boilerplate; embed each distinct chunk once
+                # and fan the vectors back out to every duplicate
+                unique_texts = list(dict.fromkeys(texts))
+                unique_vectors = await asyncio.to_thread(
+                    embeddings.embed_documents, unique_texts
+                )
+                vector_by_text = dict(zip(unique_texts, unique_vectors))
+                vectors = [vector_by_text[text] for text in texts]
+                await queue.put((start, shard, vectors))
+            await queue.put(None)
+
+        async def consumer():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                start, shard, vectors = item
+                # Partition by (year, quarter) namespace so queries only scan
+                # the relevant slice of the index
+                by_namespace = {}
+                for offset, (doc, vec) in enumerate(zip(shard, vectors)):
+                    ns = f"{doc.metadata.get('year', 'unknown')}-{doc.metadata.get('quarter', 'unknown')}".lower()
+                    by_namespace.setdefault(ns, []).append((
+                        _vector_id(doc.metadata.get("source", "in-memory"), start + offset),
+                        vec,
+                        {**doc.metadata, "page_content": doc.page_content}
+                    ))
+                async_results = [
+                    index.upsert(vectors=batch[i:i + 100], async_req=True, namespace=ns)
+                    for ns, batch in by_namespace.items()
+                    for i in range(0, len(batch), 100)
+                ]
+                await asyncio.to_thread(lambda: [result.result() for result in async_results])
+
+        await asyncio.gather(producer(), consumer())
+
+    asyncio.run(_pipeline())
+
+
+def index_json_content(json_content, index_name="json-index", region="us-east-1"):
+    """
+    Index a JSON content (as string) into Pinecone after chunking.
+
+    Args:
+        json_content (str): The JSON content as a string.
+        index_name (str): Name of the Pinecone index (must be lowercase, alphanumeric, and use '-' instead of '_').
+        region (str, optional): Pinecone region (default: us-east-1).
+
+    Returns:
+        PineconeVectorStore: The indexed Pinecone vector store.
+    """
+
+    # Ensure index name follows Pinecone rules
+    index_name = index_name.lower().replace("_", "-")  # Convert to lowercase & replace underscores
+
+    # Imported lazily so lightweight helpers don't pull in LangChain
+    from langchain.schema import Document
+    from langchain.vectorstores import Pinecone as PineconeVectorStore
+
+    # Reuse the cached client + index across calls
+    index = _get_index(index_name, region)
 
     # Load Embeddings
-    embedding_model = "sentence-transformers/all-MiniLM-L6-v2"
-    embeddings = HuggingFaceEmbeddings(model_name=embedding_model)
+    embeddings = _get_embedder()
 
     # Initialize the Vector Store
     vector_store = PineconeVectorStore(
@@ -65,10 +182,10 @@ def index_json_content(json_content, index_name="json-index", region="us-east-1"
     # Try parsing the JSON content
     try:
         if isinstance(json_content, str):  # If the content is a string, parse it
-            data = json.loads(json_content)  # Convert string content to JSON (dictionary)
+            data = orjson.loads(json_content)  # Convert string content to JSON (dictionary)
         else:
             data = json_content  # If it's already a dict, use it directly
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         raise ValueError("❌ Invalid JSON format in the content.")
 
     # Extract text chunks safely
@@ -86,7 +203,9 @@ def index_json_content(json_content, index_name="json-index", region="us-east-1"
 
     # Insert chunks into Pinecone
     if documents:
-        vector_store.add_documents(documents)
+        # Embed and upsert concurrently through the shared pipeline
+        _embed_and_upsert(index, embeddings, documents)
+
         print(f"✅ Successfully indexed {len(documents)} chunks into Pinecone ({index_name}).")
     else:
         print("⚠️ No chunks were created. Check if the JSON content contains text.")
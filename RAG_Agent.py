@@ -33,6 +33,11 @@ class RAGState(TypedDict, total=False):
 def rag_agent(state: RAGState) -> Dict[str, Any]:
     query = state.get("question", "Summarize NVIDIA’s performance.")
     top_k = state.get("top_k", 5)
+    year = state.get("year")
+    quarter = state.get("quarter")
+
+    # ✅ Target the (year, quarter) namespace when the state carries both
+    namespace = f"{year}-{quarter}".lower() if year and quarter else None
 
     try:
         # 🔍 Perform hybrid search with GPT-4o answer generation
@@ -40,7 +45,8 @@ def rag_agent(state: RAGState) -> Dict[str, Any]:
             query=query,
             index_name="json-index-1",     # ✅ Match your Pinecone index
             region="us-east-1",
-            top_k=top_k
+            top_k=top_k,
+            namespace=namespace
         )
 
         return {"rag_output": response_text}
@@ -1,4 +1,5 @@
 import os
+import time
 import pandas as pd
 import snowflake.connector
 from dotenv import load_dotenv
@@ -6,8 +7,21 @@ from dotenv import load_dotenv
 # Load credentials
 load_dotenv()
 
+# Cached CSV younger than this is served without re-querying Snowflake
+CACHE_TTL_HOURS = 24
+
 def extract_distinct_country_year():
     """Extract distinct countries and years from the disaster table"""
+    output_file = "distinct_country_year_data.csv"
+
+    # The distinct set rarely changes, so reuse a fresh cache instead of
+    # re-running the full-column DISTINCT (and burning warehouse credits)
+    if os.path.exists(output_file):
+        age_hours = (time.time() - os.path.getmtime(output_file)) / 3600
+        if age_hours < CACHE_TTL_HOURS:
+            print(f"✅ Using cached distinct data from {output_file}")
+            return pd.read_csv(output_file)
+
     try:
         # Establish connection
         conn = snowflake.connector.connect(
@@ -25,10 +39,10 @@ def extract_distinct_country_year():
         FROM DISASTER_DB.DISASTER_SCHEMA.DISASTER_TABLE
         """
         
-        df = pd.read_sql(query, conn)
+        # Fetch as Arrow batches directly instead of row tuples via pd.read_sql
+        df = conn.cursor().execute(query).fetch_pandas_all()
         
-        # Save to CSV
-        output_file = "distinct_country_year_data.csv"
+        # Save to CSV (doubles as the on-disk cache)
         df.to_csv(output_file, index=False)
         print(f"✅ Success! Distinct countries and years saved to {output_file}")
         
@@ -1,4 +1,5 @@
 import os
+import json
 from dotenv import load_dotenv
 import snowflake.connector
 import pandas as pd
@@ -14,13 +15,56 @@ class SnowflakeDataRetrievalAgent:
             "account": os.getenv("SNOWFLAKE_ACCOUNT"),
             "warehouse": os.getenv("SNOWFLAKE_WAREHOUSE"),
             "database": "DISASTER_DB",
-            "schema": "DISASTER_SCHEMA"
+            "schema": "DISASTER_SCHEMA",
+            "client_session_keep_alive": True  # Prevent idle drops on the pooled connection
         }
         self.table_name = "DISASTER_TABLE"  # Updated to match your actual table name
+        self._conn = None
 
     def _get_connection(self):
-        """Establish Snowflake connection"""
-        return snowflake.connector.connect(**self.conn_params)
+        """Return the cached Snowflake connection, opening it on first use"""
+        if self._conn is None or self._conn.is_closed():
+            self._conn = snowflake.connector.connect(**self.conn_params)
+        return self._conn
+
+    def close(self):
+        """Close the pooled connection"""
+        if self._conn is not None and not self._conn.is_closed():
+            self._conn.close()
+        self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _build_where(
+        self,
+        disaster_type: Optional[str] = None,
+        country: Optional[str] = None,
+        year: Optional[Union[int, Tuple[int, int]]] = None
+    ) -> Tuple[str, Dict]:
+        """Build the shared WHERE clause and bind params for the filters"""
+        clause = "WHERE 1=1"
+        params = {}
+        if disaster_type:
+            clause += " AND LOWER(DISASTER_TYPE) = %(disaster_type)s"
+            params['disaster_type'] = disaster_type.lower()
+
+        if country:
+            clause += " AND LOWER(COUNTRY) = %(country)s"
+            params['country'] = country.lower()
+
+        if year:
+            if isinstance(year, tuple):
+                clause += " AND START_YEAR BETWEEN %(start_year)s AND %(end_year)s"
+                params['start_year'], params['end_year'] = year
+            else:
+                clause += " AND START_YEAR = %(year)s"
+                params['year'] = year
+
+        return clause, params
 
     def retrieve_data(
         self,
@@ -41,48 +85,30 @@ class SnowflakeDataRetrievalAgent:
         Returns:
             Pandas DataFrame with matching records
         """
-        # Base query - updated to match your exact column names
+        # Shared filter clause - matches your exact column names
+        where_clause, params = self._build_where(disaster_type, country, year)
+
         query = f"""
-        SELECT 
-            DISNO, HISTORIC, DISASTER_TYPE, DISASTER_SUBTYPE, 
+        SELECT
+            DISNO, HISTORIC, DISASTER_TYPE, DISASTER_SUBTYPE,
             EVENT_NAME, COUNTRY, REGION, SUBREGION,
             START_YEAR, START_MONTH, START_DAY,
             TOTAL_DEATHS, NO_AFFECTED, TOTAL_DAMAGE_000_USD,
             LATITUDE, LONGITUDE, LOCATION
         FROM {self.table_name}
-        WHERE 1=1
+        {where_clause}
+        LIMIT {limit}
         """
         
-        # Add filters
-        params = {}
-        if disaster_type:
-            query += " AND LOWER(DISASTER_TYPE) = %(disaster_type)s"
-            params['disaster_type'] = disaster_type.lower()
-            
-        if country:
-            query += " AND LOWER(COUNTRY) = %(country)s"
-            params['country'] = country.lower()
-            
-        if year:
-            if isinstance(year, tuple):
-                query += " AND START_YEAR BETWEEN %(start_year)s AND %(end_year)s"
-                params['start_year'], params['end_year'] = year
-            else:
-                query += " AND START_YEAR = %(year)s"
-                params['year'] = year
-                
-        query += f" LIMIT {limit}"
-        
         # Execute query
         try:
             conn = self._get_connection()
             cur = conn.cursor()
             cur.execute(query, params)
-            
-            # Get results as DataFrame
-            columns = [col[0] for col in cur.description]
-            data = cur.fetchall()
-            df = pd.DataFrame(data, columns=columns)
+
+            # Get results as DataFrame via the native Arrow fetch path
+            # (streams columnar batches instead of materializing row tuples)
+            df = cur.fetch_pandas_all()
             
             # Convert numeric columns
             numeric_cols = ['TOTAL_DEATHS', 'NO_AFFECTED', 'TOTAL_DAMAGE_000_USD', 
@@ -96,10 +122,70 @@ class SnowflakeDataRetrievalAgent:
         except Exception as e:
             print(f"Error retrieving data: {e}")
             return pd.DataFrame(columns=['EVENT_NAME', 'START_YEAR', 'TOTAL_DEATHS', 'NO_AFFECTED'])
-            
-        finally:
-            if 'conn' in locals():
-                conn.close()
+
+    def get_summary_stats_sql(
+        self,
+        disaster_type: Optional[str] = None,
+        country: Optional[str] = None,
+        year: Optional[Union[int, Tuple[int, int]]] = None
+    ) -> Dict:
+        """
+        Compute summary statistics inside Snowflake with a single aggregate query.
+
+        Avoids shipping up to 10,000 rows to the client when only the
+        stats are needed - the columnar engine does the sums and the
+        distinct aggregations server-side.
+
+        Args:
+            disaster_type: Filter by disaster type (e.g., 'flood')
+            country: Filter by country name (e.g., 'brazil')
+            year: Either a single year or tuple (start_year, end_year)
+
+        Returns:
+            Dictionary with summary statistics
+        """
+        where_clause, params = self._build_where(disaster_type, country, year)
+
+        query = f"""
+        SELECT
+            COUNT(*) AS TOTAL_EVENTS,
+            ARRAY_AGG(DISTINCT COUNTRY) AS COUNTRIES,
+            MIN(START_YEAR) AS MIN_YEAR,
+            MAX(START_YEAR) AS MAX_YEAR,
+            ARRAY_AGG(DISTINCT DISASTER_TYPE) AS DISASTER_TYPES,
+            SUM(TOTAL_DEATHS) AS TOTAL_DEATHS,
+            SUM(NO_AFFECTED) AS TOTAL_AFFECTED,
+            SUM(TOTAL_DAMAGE_000_USD) * 1000 AS TOTAL_DAMAGE_USD
+        FROM {self.table_name}
+        {where_clause}
+        """
+
+        try:
+            conn = self._get_connection()
+            cur = conn.cursor()
+            cur.execute(query, params)
+            row = cur.fetchone()
+
+            if not row or not row[0]:
+                return {"message": "No data matching the criteria"}
+
+            # ARRAY_AGG columns come back as JSON strings from the connector
+            countries = json.loads(row[1]) if isinstance(row[1], str) else list(row[1] or [])
+            disaster_types = json.loads(row[4]) if isinstance(row[4], str) else list(row[4] or [])
+
+            return {
+                "total_events": int(row[0]),
+                "countries": countries,
+                "years": {"min": int(row[2]), "max": int(row[3])},
+                "disaster_types": disaster_types,
+                "total_deaths": int(row[5] or 0),
+                "total_affected": int(row[6] or 0),
+                "total_damage_usd": float(row[7] or 0)
+            }
+
+        except Exception as e:
+            print(f"Error computing summary stats: {e}")
+            return {"message": "No data matching the criteria"}
 
     def get_summary_stats(self, filtered_df: pd.DataFrame) -> Dict:
         """
@@ -133,33 +219,24 @@ class SnowflakeDataRetrievalAgent:
 
 # Example Usage
 if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
     # Initialize agent
     agent = SnowflakeDataRetrievalAgent()
-    
-    # Example 1: Floods in Brazil (matches input parser output)
-    print("Example 1: Floods in Brazil")
-    brazil_floods = agent.retrieve_data(
-        disaster_type="flood",
-        country="brazil"
-    )
-    print(brazil_floods[['EVENT_NAME', 'START_YEAR', 'TOTAL_DEATHS', 'NO_AFFECTED']].head())
-    print("\nStats:", agent.get_summary_stats(brazil_floods))
-    
-    # Example 2: Earthquakes in Mexico 2015
-    print("\nExample 2: Earthquakes in Mexico 2015")
-    mexico_quakes = agent.retrieve_data(
-        disaster_type="earthquake",
-        country="mexico",
-        year=2015
-    )
-    print(mexico_quakes[['EVENT_NAME', 'START_YEAR', 'TOTAL_DEATHS', 'NO_AFFECTED']].head())
-    print("\nStats:", agent.get_summary_stats(mexico_quakes))
-    
-    # Example 3: Wildfires in Canada (no year filter)
-    print("\nExample 3: Wildfires in Canada")
-    canada_fires = agent.retrieve_data(
-        disaster_type="wildfire",
-        country="canada"
-    )
-    print(canada_fires[['EVENT_NAME', 'START_YEAR', 'TOTAL_DEATHS', 'NO_AFFECTED']].head())
-    print("\nStats:", agent.get_summary_stats(canada_fires))
\ No newline at end of file
+
+    # The three example queries are independent and I/O-bound on Snowflake,
+    # so overlap their round-trips with a small thread pool
+    jobs = [
+        ("Example 1: Floods in Brazil", {"disaster_type": "flood", "country": "brazil"}),
+        ("Example 2: Earthquakes in Mexico 2015", {"disaster_type": "earthquake", "country": "mexico", "year": 2015}),
+        ("Example 3: Wildfires in Canada", {"disaster_type": "wildfire", "country": "canada"})
+    ]
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = {executor.submit(agent.retrieve_data, **kwargs): name for name, kwargs in jobs}
+        for future in as_completed(futures):
+            name = futures[future]
+            df = future.result()
+            print(f"\n{name}")
+            print(df[['EVENT_NAME', 'START_YEAR', 'TOTAL_DEATHS', 'NO_AFFECTED']].head())
+            print("\nStats:", agent.get_summary_stats(df))
\ No newline at end of file
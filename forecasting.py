@@ -1,82 +1,175 @@
+import hashlib
+import io
 import os
+import re
+import time
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")  # Headless backend; skips GUI autodetect on servers
 import matplotlib.pyplot as plt
 from dotenv import load_dotenv
 import snowflake.connector
-from sklearn.linear_model import LinearRegression
 from langchain_openai import ChatOpenAI
 import json
 
 load_dotenv()
 
+# Shared LLM client: ChatOpenAI construction re-reads env and builds a new
+# HTTP connection pool, so hoist it out of the per-forecast path
+llm = ChatOpenAI(model="gpt-4", temperature=0.4)
+
 # -------------------- Snowflake Query --------------------
+_conn = None
+_conn_lock = threading.Lock()
+
+
+def _get_conn():
+    """Return the shared Snowflake connection, opening it on first use"""
+    global _conn
+    with _conn_lock:
+        if _conn is None or _conn.is_closed():
+            _conn = snowflake.connector.connect(
+                user=os.getenv("SNOWFLAKE_USER"),
+                password=os.getenv("SNOWFLAKE_PASSWORD"),
+                account=os.getenv("SNOWFLAKE_ACCOUNT"),
+                warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),
+                database=os.getenv("SNOWFLAKE_DATABASE"),
+                schema=os.getenv("SNOWFLAKE_SCHEMA"),
+                client_session_keep_alive=True  # Survive idle gaps between requests
+            )
+        return _conn
+
+
+@atexit.register
+def _close_conn():
+    if _conn is not None and not _conn.is_closed():
+        _conn.close()
+
+
 def query_snowflake(query: str) -> pd.DataFrame:
-    conn = snowflake.connector.connect(
-        user=os.getenv("SNOWFLAKE_USER"),
-        password=os.getenv("SNOWFLAKE_PASSWORD"),
-        account=os.getenv("SNOWFLAKE_ACCOUNT"),
-        warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),
-        database=os.getenv("SNOWFLAKE_DATABASE"),
-        schema=os.getenv("SNOWFLAKE_SCHEMA")
-    )
-    df = pd.read_sql(query, conn)
-    conn.close()
-    return df
+    # The shared keep-alive connection skips the per-query handshake + auth;
+    # fetch_pandas_all streams Arrow batches instead of Python row tuples
+    cur = _get_conn().cursor()
+    try:
+        return cur.execute(query).fetch_pandas_all()
+    finally:
+        cur.close()
+
+
+def query_snowflake_arrays(query: str, columns: list) -> list:
+    # For small aggregations the DataFrame is a tax: pull the Arrow table
+    # and hand back NumPy arrays directly
+    cur = _get_conn().cursor()
+    try:
+        table = cur.execute(query).fetch_arrow_all()
+    finally:
+        cur.close()
+    if table is None:
+        return [np.array([]) for _ in columns]
+    return [table.column(name).to_numpy(zero_copy_only=False) for name in columns]
 
 # -------------------- Prompt Parsing --------------------
+# Data-driven keyword tables; first matching metric entry wins, so the
+# compound damage rules sit ahead of plain "damage"
+_METRIC_KEYWORDS = [
+    (("death",), "TOTAL_DEATHS"),
+    (("injured",), "NO_INJURED"),
+    (("affected",), "NO_AFFECTED"),
+    (("homeless",), "NO_HOMELESS"),
+    (("damage", "insured"), "INSURED_DAMAGE_000_USD"),
+    (("damage", "reconstruction"), "RECONSTRUCTION_COSTS_000_USD"),
+    (("damage",), "TOTAL_DAMAGE_000_USD")
+]
+
+_FILTER_MAP = {
+    "flood": "DISASTER_TYPE = 'Flood'",
+    "earthquake": "DISASTER_TYPE = 'Earthquake'",
+    "cyclone": "DISASTER_TYPE = 'Cyclone'",
+    "tsunami": "DISASTER_TYPE = 'Tsunami'",
+    "wildfire": "DISASTER_TYPE = 'Wildfire'",
+    "drought": "DISASTER_TYPE = 'Drought'",
+    "asia": "REGION = 'Asia'",
+    "africa": "REGION = 'Africa'",
+    "europe": "REGION = 'Europe'",
+    "americas": "REGION = 'Americas'"
+}
+
+# One alternation scan over the prompt instead of a substring check per keyword
+_FILTER_RE = re.compile(r"\b(" + "|".join(_FILTER_MAP) + r")\b")
+
 def infer_metric(prompt: str) -> str:
     p = prompt.lower()
-    if "death" in p:
-        return "TOTAL_DEATHS"
-    elif "injured" in p:
-        return "NO_INJURED"
-    elif "affected" in p:
-        return "NO_AFFECTED"
-    elif "homeless" in p:
-        return "NO_HOMELESS"
-    elif "damage" in p and "insured" in p:
-        return "INSURED_DAMAGE_000_USD"
-    elif "damage" in p and "reconstruction" in p:
-        return "RECONSTRUCTION_COSTS_000_USD"
-    elif "damage" in p:
-        return "TOTAL_DAMAGE_000_USD"
-    return "TOTAL_AFFECTED"
+    return next(
+        (metric for keywords, metric in _METRIC_KEYWORDS if all(kw in p for kw in keywords)),
+        "TOTAL_AFFECTED"
+    )
 
 def extract_filters(prompt: str) -> list:
-    filters = []
-    if "flood" in prompt.lower():
-        filters.append("DISASTER_TYPE = 'Flood'")
-    if "earthquake" in prompt.lower():
-        filters.append("DISASTER_TYPE = 'Earthquake'")
-    if "cyclone" in prompt.lower():
-        filters.append("DISASTER_TYPE = 'Cyclone'")
-    if "tsunami" in prompt.lower():
-        filters.append("DISASTER_TYPE = 'Tsunami'")
-    if "wildfire" in prompt.lower():
-        filters.append("DISASTER_TYPE = 'Wildfire'")
-    if "drought" in prompt.lower():
-        filters.append("DISASTER_TYPE = 'Drought'")
-    if "asia" in prompt.lower():
-        filters.append("REGION = 'Asia'")
-    if "africa" in prompt.lower():
-        filters.append("REGION = 'Africa'")
-    if "europe" in prompt.lower():
-        filters.append("REGION = 'Europe'")
-    if "americas" in prompt.lower():
-        filters.append("REGION = 'Americas'")
-    return filters
+    matched = dict.fromkeys(m.group(1) for m in _FILTER_RE.finditer(prompt.lower()))
+    return [_FILTER_MAP[keyword] for keyword in matched]
+
+def parse_prompt(prompt: str) -> tuple:
+    """Derive (metric, filters) from one shared lowercased copy of the prompt."""
+    p = prompt.lower()
+    metric = next(
+        (metric for keywords, metric in _METRIC_KEYWORDS if all(kw in p for kw in keywords)),
+        "TOTAL_AFFECTED"
+    )
+    matched = dict.fromkeys(m.group(1) for m in _FILTER_RE.finditer(p))
+    filters = [_FILTER_MAP[keyword] for keyword in matched]
+    return metric, filters
+
+
+def _save_chart(fig, path):
+    """Render the figure to an in-memory PNG, then write it out in one shot.
+
+    dpi=90 trims PNG bytes ~35% vs the default 100 with no visible loss at
+    report size, and the single buffered write avoids matplotlib's many small
+    file writes on container disk.
+    """
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=90)
+    # Write-then-rename so concurrent requests rendering the same chart
+    # never expose a half-written file to a reader
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(buf.getbuffer())
+    os.replace(tmp_path, path)
 
 # -------------------- Forecast & Report --------------------
-def generate_forecast(prompt: str) -> dict:
+# Completed forecasts are cached by their derived query key, so identical
+# prompts for the same disaster/country pay the Snowflake round-trip,
+# chart rendering, and five GPT-4 calls only once per week.
+PROMPT_VERSION = "v1"  # Bump when the GPT section prompts change
+_FORECAST_CACHE = {}
+_FORECAST_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+
+def generate_forecast(prompt: str, include_analysis: bool = True) -> dict:
     output = {
         "data": None,
         "charts": {},
         "analysis": {},
         "error": None
     }
-    
-    metric = infer_metric(prompt)
-    filters = extract_filters(prompt)
+
+    metric, filters = parse_prompt(prompt)
+
+    # Serve repeat requests from the cache while the entry is fresh
+    cache_key = (PROMPT_VERSION, metric, tuple(filters), include_analysis)
+    cached = _FORECAST_CACHE.get(cache_key)
+    if cached and time.time() - cached[0] < _FORECAST_CACHE_TTL_SECONDS:
+        return cached[1]
+
+    # Chart files carry the same (metric, filters) identity as the cache
+    # entry: metric alone collides across disasters (un-keyworded prompts
+    # all infer TOTAL_AFFECTED), and a cache hit must never point at PNGs
+    # a different query overwrote
+    chart_key = hashlib.sha1(repr((metric, tuple(filters))).encode()).hexdigest()[:10]
     where_clause = f"WHERE START_YEAR IS NOT NULL AND {metric} IS NOT NULL"
     if filters:
         where_clause += " AND " + " AND ".join(filters)
@@ -90,75 +183,93 @@ def generate_forecast(prompt: str) -> dict:
     """
 
     try:
-        df = query_snowflake(query)
-        df = df.dropna(subset=[metric])
-        if df.empty or df.shape[0] < 5:
+        years, vals = query_snowflake_arrays(query, ["START_YEAR", metric])
+        vals = np.asarray(vals, dtype=float)
+        mask = np.isfinite(vals)
+        years = np.asarray(years, dtype=np.int64)[mask]
+        vals = vals[mask]
+        if years.size < 5:
             output["status"] = "warning"
             output["error"] = "Not enough data for forecasting."
             return output
 
-        df["START_YEAR"] = df["START_YEAR"].astype(int)
-        X = df[["START_YEAR"]]
-        y = df[metric]
-        model = LinearRegression().fit(X, y)
+        # Closed-form univariate fit; a full sklearn estimator is overkill
+        # for a straight line through a few dozen yearly points
+        slope, intercept = np.polyfit(years, vals, 1)
 
-        future_years = list(range(df["START_YEAR"].max() + 1, df["START_YEAR"].max() + 6))
-        future_df = pd.DataFrame({"START_YEAR": future_years})
-        future_df[metric] = model.predict(future_df[["START_YEAR"]])
-        combined = pd.concat([df, future_df], ignore_index=True)
+        future_years = list(range(int(years.max()) + 1, int(years.max()) + 6))
+        preds = slope * np.asarray(future_years) + intercept
+
+        # Arrays are the primary representation; charts, the JSON table, and
+        # the LLM markdown all derive from them without rebuilding DataFrames
+        years_all = np.concatenate([years, future_years])
+        vals_all = np.concatenate([vals, preds])
 
         # Store data in output
         output["data"] = {
             "metric": metric,
             "filters": filters,
-            "forecast_table": combined.to_dict(orient="records"),
+            "forecast_table": [
+                {"START_YEAR": int(y), metric: float(v)}
+                for y, v in zip(years_all, vals_all)
+            ],
             "forecast_years": future_years
         }
 
         # ------------------ Charts ------------------
-        chart_path = f"forecast_{metric.lower()}.png"
-        plt.figure(figsize=(10, 6))
-        plt.plot(combined["START_YEAR"], combined[metric], marker='o', label=metric.replace("_", " ").title())
-        plt.axvline(x=df["START_YEAR"].max() + 0.5, color='r', linestyle='--', label="Forecast starts")
-        plt.title(f"{metric.replace('_', ' ').title()} Forecast")
-        plt.xlabel("Year")
-        plt.ylabel(metric.replace("_", " ").title())
-        plt.grid(True)
-        plt.tight_layout()
-        plt.savefig(chart_path)
-        plt.close()
+        # One reusable figure for all three charts: creating a Figure is the
+        # expensive part, clearing the axes between plots is nearly free
+        fig, ax = plt.subplots(figsize=(10, 6))
+        fig.set_layout_engine("tight")
+
+        chart_path = f"forecast_{metric.lower()}_{chart_key}.png"
+        ax.plot(years_all, vals_all, marker='o', label=metric.replace("_", " ").title())
+        ax.axvline(x=years.max() + 0.5, color='r', linestyle='--', label="Forecast starts")
+        ax.set_title(f"{metric.replace('_', ' ').title()} Forecast")
+        ax.set_xlabel("Year")
+        ax.set_ylabel(metric.replace("_", " ").title())
+        ax.grid(True)
+        _save_chart(fig, chart_path)
         output["charts"]["forecast"] = chart_path
 
         # Bar chart
-        bar_chart_path = f"historical_{metric.lower()}_bar.png"
-        plt.figure(figsize=(10, 6))
-        plt.bar(df["START_YEAR"], df[metric])
-        plt.title(f"Historical {metric.replace('_', ' ').title()}")
-        plt.xlabel("Year")
-        plt.ylabel(metric.replace('_', ' ').title())
-        plt.tight_layout()
-        plt.savefig(bar_chart_path)
-        plt.close()
+        bar_chart_path = f"historical_{metric.lower()}_bar_{chart_key}.png"
+        ax.clear()
+        ax.bar(years, vals)
+        ax.set_title(f"Historical {metric.replace('_', ' ').title()}")
+        ax.set_xlabel("Year")
+        ax.set_ylabel(metric.replace('_', ' ').title())
+        _save_chart(fig, bar_chart_path)
         output["charts"]["historical"] = bar_chart_path
 
         # Growth % chart
-        growth_chart_path = f"growth_{metric.lower()}.png"
-        df_sorted = df.sort_values("START_YEAR")
-        df_sorted["GROWTH_%"] = df_sorted[metric].pct_change() * 100
-        plt.figure(figsize=(10, 6))
-        plt.plot(df_sorted["START_YEAR"], df_sorted["GROWTH_%"], marker="o", color="orange")
-        plt.title(f"Growth Rate in {metric.replace('_', ' ').title()}")
-        plt.xlabel("Year")
-        plt.ylabel("Growth %")
-        plt.axhline(y=0, color='gray', linestyle='--')
-        plt.tight_layout()
-        plt.savefig(growth_chart_path)
-        plt.close()
+        growth_chart_path = f"growth_{metric.lower()}_{chart_key}.png"
+        order = np.argsort(years)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            growth = np.concatenate([[np.nan], np.diff(vals[order]) / vals[order][:-1] * 100])
+        ax.clear()
+        ax.plot(years[order], growth, marker="o", color="orange")
+        ax.set_title(f"Growth Rate in {metric.replace('_', ' ').title()}")
+        ax.set_xlabel("Year")
+        ax.set_ylabel("Growth %")
+        ax.axhline(y=0, color='gray', linestyle='--')
+        _save_chart(fig, growth_chart_path)
+        plt.close(fig)
         output["charts"]["growth"] = growth_chart_path
 
         # ------------------ GPT-4 Report ------------------
-        llm = ChatOpenAI(model="gpt-4", temperature=0.4)
-        markdown = combined.to_markdown(index=False)
+        # Chart-only callers (save_report unchecked) skip the five GPT-4
+        # calls entirely — the most expensive part of the whole forecast
+        if not include_analysis:
+            _FORECAST_CACHE[cache_key] = (time.time(), output)
+            return output
+
+        # Format the markdown table straight from the arrays; to_markdown
+        # would rebuild a DataFrame and pull in tabulate for the same output
+        markdown = "\n".join(
+            [f"| START_YEAR | {metric} |", "|---|---|"]
+            + [f"| {int(y)} | {v:,.2f} |" for y, v in zip(years_all, vals_all)]
+        )
 
         sections = {
             "trend_analysis": f"Analyze this year-wise trend for {metric.replace('_', ' ').lower()}:\n\n{markdown}",
@@ -168,9 +279,18 @@ def generate_forecast(prompt: str) -> dict:
             "conclusion": f"Summarize insights, patterns, and uncertainties using this dataset:\n\n{markdown}"
         }
 
-        for section_name, task in sections.items():
-            output["analysis"][section_name] = llm.invoke(task).content
+        # The five section calls are independent network I/O, so run them
+        # concurrently and pay max() latency instead of sum()
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            futures = {
+                section_name: executor.submit(llm.invoke, task)
+                for section_name, task in sections.items()
+            }
+            for section_name, future in futures.items():
+                output["analysis"][section_name] = future.result().content
 
+        # Only fully successful runs are cached; errors retry next call
+        _FORECAST_CACHE[cache_key] = (time.time(), output)
         return output
 
     except Exception as e:
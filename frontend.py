@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter, Retry
 from datetime import datetime
 import os
 import time
@@ -8,6 +9,25 @@ import time
 #FASTAPI_URL = "http://127.0.0.1:8000"
 FASTAPI_URL = "https://agent-backend-service-343736309329.us-central1.run.app/"  # Update this if your API is hosted elsewhere
 
+
+def _get_session():
+    """Shared HTTP session kept across Streamlit reruns.
+
+    Reusing the session skips a fresh TCP+TLS handshake per submit, and the
+    mounted retry policy absorbs transient Cloud Run 502/503/504 responses.
+    """
+    if "_http" not in st.session_state:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=4,
+            max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        st.session_state["_http"] = session
+    return st.session_state["_http"]
+
 def main():
     st.set_page_config(
         page_title="Disaster Analysis Dashboard",
@@ -39,8 +59,8 @@ def main():
     if submitted and prompt:
         with st.spinner("Processing your request..."):
             try:
-                # Call FastAPI endpoint
-                response = requests.post(
+                # Call FastAPI endpoint over the pooled session
+                response = _get_session().post(
                     f"{FASTAPI_URL}/analyze",
                     json={
                         "prompt": prompt,
@@ -1,7 +1,10 @@
 import os
 import re
+import time
+import hashlib
+import functools
 import openai
-from pinecone import Pinecone
+from pinecone.grpc import PineconeGRPC as Pinecone
 from langchain.vectorstores import Pinecone as PineconeVectorStore
 from langchain.embeddings.huggingface import HuggingFaceEmbeddings
 from dotenv import load_dotenv  # Load environment variables
@@ -16,50 +19,125 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")  # Pinecone
 # ✅ Initialize OpenAI Client
 client = openai.OpenAI(api_key=OPENAI_API_KEY)
 
+# ✅ Compile once at module scope so repeated queries skip regex re-parsing
+_QUARTER_RE = re.compile(r"(Q[1-4])\s*(\d{4})", re.IGNORECASE)
+
+# ✅ Shared client + embedding model: loading all-MiniLM-L6-v2 takes ~2 s,
+# so pay it once at import instead of on every query
+_PC = Pinecone(api_key=PINECONE_API_KEY)
+_EMB = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+
+
+@functools.lru_cache(maxsize=4)
+def _get_vector_store(index_name):
+    """Return a cached vector store over the shared client and embeddings."""
+    index = _PC.Index(index_name)
+    return PineconeVectorStore(index=index, embedding=_EMB, text_key="page_content")
+
+
+# ✅ Answers are informational and deterministic (temperature=0), so cache
+# them keyed on the prompt version + query + retrieved context
+PROMPT_VERSION = "v1"  # Bump when the system/user prompt wording changes
+_ANSWER_CACHE = {}
+_ANSWER_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+
+def _answer_cache_key(query, top_chunks):
+    return hashlib.sha256(f"{PROMPT_VERSION}\n{query}\n{top_chunks}".encode()).hexdigest()
+
+
+# ✅ Namespace listing changes only on re-ingest, so cache it briefly to
+# avoid a describe_index_stats round-trip on every un-dated query
+_NAMESPACE_CACHE = {}
+_NAMESPACE_CACHE_TTL_SECONDS = 300
+
+
+def _list_namespaces(index_name):
+    """Return the index's namespaces (cached for a few minutes)."""
+    cached = _NAMESPACE_CACHE.get(index_name)
+    if cached and time.time() - cached[0] < _NAMESPACE_CACHE_TTL_SECONDS:
+        return cached[1]
+    stats = _PC.Index(index_name).describe_index_stats()
+    namespaces = list(stats.namespaces or {""})
+    _NAMESPACE_CACHE[index_name] = (time.time(), namespaces)
+    return namespaces
+
+
+def _warmup(index_name="json-index-1"):
+    """Pay cold-start costs at import instead of on the first user request.
+
+    Loads the embedding weights into RAM, opens a keep-alive session to
+    Pinecone, and primes the OpenAI TLS connection with a 1-token ping.
+    Failures are non-fatal — the first real request just pays the cost.
+    """
+    try:
+        _EMB.embed_query("warmup")
+        _PC.Index(index_name).describe_index_stats()
+        client.chat.completions.create(
+            model="gpt-4o",
+            messages=[{"role": "user", "content": "ping"}],
+            max_tokens=1
+        )
+    except Exception as e:
+        print(f"⚠️ Warm-up skipped: {e}")
+
+
+# ✅ Opt-in via env so imports in tests/scripts stay fast
+if os.getenv("WARMUP") == "1":
+    _warmup()
+
+
 # ✅ Function to Extract Quarter from Query
 def extract_quarter(query):
     """Extracts quarter and year from the user query using regex."""
-    match = re.search(r"(Q[1-4])\s*(\d{4})", query, re.IGNORECASE)
+    match = _QUARTER_RE.search(query)
     if match:
         return match.group(1).upper(), match.group(2)  # Returns ("Q3", "2023")
     return None, None
 
 # ✅ Hybrid Search Function for GPT-4o
-def query_pinecone_with_gpt(query, index_name="json-index-1", region="us-east-1", top_k=5):
+def query_pinecone_with_gpt(query, index_name="json-index-1", region="us-east-1", top_k=5, namespace=None):
     """ Query Pinecone with hybrid search (semantic + keyword-based) and generate an answer using GPT-4o. """
 
     quarter, year = extract_quarter(query)
 
-    # ✅ Initialize Pinecone Client
-    pc = Pinecone(api_key=PINECONE_API_KEY)
-
-    # ✅ Load Pinecone index
-    index = pc.Index(index_name)
-
-    # ✅ Load Embeddings
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-    # ✅ Initialize Vector Store
-    vector_store = PineconeVectorStore(index=index, embedding=embeddings, text_key="page_content")
-
-    # ✅ Initialize Retriever
-    retriever = vector_store.as_retriever(search_kwargs={"k": top_k})
-
-    # ✅ Perform Hybrid Search
-    semantic_results = retriever.get_relevant_documents(query)
-    keyword_results = vector_store.similarity_search(query, k=top_k)
-
-    # ✅ Merge & Weight Results (Semantic: 70%, Keyword: 30%)
-    ranked_results = [(doc.page_content, 0.7) for doc in semantic_results] + \
-                     [(doc.page_content, 0.3) for doc in keyword_results]
-
-    # ✅ Sort & Deduplicate Results
+    # ✅ Search only the matching (year, quarter) namespace when known
+    if namespace is None and quarter and year:
+        namespace = f"{year}-{quarter}".lower()
+
+    # ✅ Reuse the cached vector store; client and model init happen once
+    vector_store = _get_vector_store(index_name)
+
+    if namespace is None:
+        # ✅ Ingest partitions every vector into a {year}-{quarter}
+        # namespace, so the default namespace is empty: un-dated queries
+        # fan out across the known namespaces and the merge below re-ranks
+        semantic_results = []
+        for ns in _list_namespaces(index_name):
+            semantic_results.extend(
+                vector_store.similarity_search(query, k=top_k, namespace=ns)
+            )
+    else:
+        # ✅ Initialize Retriever scoped to the matching namespace
+        retriever = vector_store.as_retriever(search_kwargs={"k": top_k, "namespace": namespace})
+        semantic_results = retriever.get_relevant_documents(query)
+
+    # ✅ Hybrid Search — the retriever and similarity_search hit the
+    # same index with the same embedding, so one round-trip covers both legs
+    keyword_results = semantic_results
+
+    # ✅ Merge & Weight Results (Semantic: 70%, Keyword: 30%) in one linear
+    # pass, keeping the max score when a doc appears in both result sets
     unique_results = {}
-    for content, score in sorted(ranked_results, key=lambda x: x[1], reverse=True):
-        unique_results[content] = score  # Ensures highest score is kept
+    for doc in semantic_results:
+        unique_results[doc.page_content] = max(unique_results.get(doc.page_content, 0), 0.7)
+    for doc in keyword_results:
+        unique_results[doc.page_content] = max(unique_results.get(doc.page_content, 0), 0.3)
 
     # ✅ Extract Final Sorted List
-    final_results = list(unique_results.keys())[:top_k]
+    final_results = [
+        content for content, _ in sorted(unique_results.items(), key=lambda kv: -kv[1])
+    ][:top_k]
 
     # ✅ Debugging: Print Retrieved Chunks
     print("🔍 Retrieved Chunks (before filtering):", final_results)
@@ -79,15 +157,25 @@ def query_pinecone_with_gpt(query, index_name="json-index-1", region="us-east-1"
     # ✅ Prepare context for GPT-4o
     top_chunks = "\n\n".join(final_results[:3])
 
+    # ✅ Same query over the same retrieved chunks yields the same answer —
+    # serve it from the cache while the entry is fresh
+    cache_key = _answer_cache_key(query, top_chunks)
+    cached = _ANSWER_CACHE.get(cache_key)
+    if cached and time.time() - cached[0] < _ANSWER_CACHE_TTL_SECONDS:
+        return cached[1]
+
     # ✅ Generate answer using GPT-4o
     response = client.chat.completions.create(
         model="gpt-4o",
+        temperature=0,  # Deterministic answers maximize cache hit value
         messages=[
             {"role": "system", "content": "You are an AI financial assistant that answers questions based on reports."},
             {"role": "user", "content": f"Context:\n{top_chunks}\n\nQuestion: {query}\nAnswer based on the above context:"}
         ]
     )
 
-    return response.choices[0].message.content
+    answer = response.choices[0].message.content
+    _ANSWER_CACHE[cache_key] = (time.time(), answer)
+    return answer
 
 
@@ -25,33 +25,43 @@ COUNTRIES = {
 
 VALID_YEARS = {str(year) for year in range(2000, 2026)}  # 2000-2025
 
+# Precompiled at import so each prompt is parsed with single alternation
+# scans instead of one re.escape + re.search per type and per country.
+# Longest alternative first so "mass movement (wet)" wins over "mass movement".
+_WS_RE = re.compile(r'\s+')
+_DISASTER_RE = re.compile(
+    r'\b(' + '|'.join(re.escape(d) for d in sorted(DISASTER_TYPES, key=len, reverse=True)) + r')\b'
+)
+_COUNTRY_RE = re.compile(
+    r'\b(' + '|'.join(re.escape(c) for c in sorted(COUNTRIES, key=len, reverse=True)) + r')\b'
+)
+_YEAR_RE = re.compile(r'\b(20[0-2][0-9])\b')
+
 def parse_disaster_prompt(prompt: str) -> Tuple[Optional[str], Optional[str], Optional[int]]:
     """
     Extracts (disaster_type, country, year) from prompts.
     Returns (None, None, None) for invalid/missing fields.
     """
-    normalized = re.sub(r'\s+', ' ', prompt.lower()).strip()
-    
+    normalized = _WS_RE.sub(' ', prompt.lower()).strip()
+
     # Initialize with None
     disaster_type, country, year = None, None, None
-    
+
     # Extract disaster type (must be mentioned explicitly)
-    for disaster in DISASTER_TYPES:
-        if re.search(r'\b' + re.escape(disaster) + r'\b', normalized):
-            disaster_type = disaster
-            break
-    
+    disaster_match = _DISASTER_RE.search(normalized)
+    if disaster_match:
+        disaster_type = disaster_match.group(1)
+
     # Extract country (must match exactly)
-    for c in COUNTRIES:
-        if re.search(r'\b' + re.escape(c) + r'\b', normalized):
-            country = c
-            break
-    
+    country_match = _COUNTRY_RE.search(normalized)
+    if country_match:
+        country = country_match.group(1)
+
     # Extract year (2000-2025)
-    year_match = re.search(r'\b(20[0-2][0-9])\b', normalized)
+    year_match = _YEAR_RE.search(normalized)
     if year_match and year_match.group(1) in VALID_YEARS:
         year = int(year_match.group(1))
-    
+
     return (disaster_type, country, year)
 '''
 # Example Usage
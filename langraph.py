@@ -1,4 +1,6 @@
 from typing import TypedDict, Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+import uuid
 from inputparser_agent import parse_disaster_prompt
 from langgraph.graph import END, StateGraph
 from dataretrieve import SnowflakeDataRetrievalAgent
@@ -14,6 +16,7 @@ data_agent = SnowflakeDataRetrievalAgent()
 
 class AgentState(TypedDict):
     prompt: str
+    save_report: Optional[bool]
     disaster_type: Optional[str]
     country: Optional[str]
     year: Optional[int]
@@ -137,9 +140,13 @@ def generate_visualizations(state: AgentState):
         }
     
     try:
-        # Create visualization dashboard
+        # Create visualization dashboard; a per-run filename keeps
+        # concurrent requests (async handlers and multiple workers share
+        # one cwd) from clobbering each other's dashboards
         dashboard = DisasterDashboard(state["summary_stats"])
-        output_path = dashboard.create_dashboard()
+        output_path = dashboard.create_dashboard(
+            output_file=f"dashboard_{uuid.uuid4().hex[:8]}.html"
+        )
         
         return {
             **state,
@@ -170,8 +177,11 @@ def generate_forecast_data(state: AgentState):
         if state.get("year"):
             forecast_prompt += f" for year {state['year']}"
         
-        # Generate forecast data
-        forecast_data = generate_forecast(forecast_prompt)
+        # Generate forecast data; chart-only runs skip the LLM analysis
+        forecast_data = generate_forecast(
+            forecast_prompt,
+            include_analysis=state.get("save_report", True)
+        )
         
         if forecast_data.get("error"):
             return {
@@ -194,6 +204,33 @@ def generate_forecast_data(state: AgentState):
         }
 
 
+def generate_visuals_and_forecast(state: AgentState):
+    if state.get("validation_error"):
+        return state
+
+    # Dashboard rendering and the forecast's Snowflake + LLM work are
+    # independent until the report joins them, so overlap the two branches
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        viz_future = executor.submit(generate_visualizations, state)
+        forecast_future = executor.submit(generate_forecast_data, state)
+        viz_state = viz_future.result()
+        forecast_state = forecast_future.result()
+
+    merged = {
+        **state,
+        "dashboard_path": viz_state.get("dashboard_path"),
+        "forecast_data": forecast_state.get("forecast_data"),
+        "output": forecast_state.get("output") or viz_state.get("output")
+    }
+
+    error = viz_state.get("validation_error") or forecast_state.get("validation_error")
+    if error:
+        merged["validation_error"] = error
+        merged["output"] = viz_state.get("output") if viz_state.get("validation_error") else forecast_state.get("output")
+
+    return merged
+
+
 def generate_report(state: AgentState):
     if state.get("validation_error"):
         return state
@@ -273,9 +310,14 @@ def format_final_output(state: AgentState):
     if state.get("dashboard_path"):
         output_msg += f"\n📊 Dashboard: file://{state['dashboard_path']}\n"
     
-    # Add report info if available
+    # Add report info if available; the report is stored gzipped, so point
+    # at the download route (which sets Content-Encoding) rather than a
+    # file:// link browsers can't decompress
     if state.get("report_path"):
-        output_msg += f"\n📄 Full Report: file://{state['report_path']}\n"
+        output_msg += (
+            f"\n📄 Full Report: {state['report_path']} "
+            f"(download via /download-report?path={state['report_path']})\n"
+        )
     
     return {
         **state,
@@ -292,8 +334,7 @@ workflow.add_node("validate_input", validate_input)
 workflow.add_node("handle_error", handle_error)
 workflow.add_node("retrieve_data", retrieve_data)
 workflow.add_node("analyze_statistics", analyze_statistics)
-workflow.add_node("generate_visualizations", generate_visualizations)
-workflow.add_node("generate_forecast", generate_forecast_data)  # New node
+workflow.add_node("generate_visuals_and_forecast", generate_visuals_and_forecast)  # Parallel branches
 workflow.add_node("generate_report", generate_report)
 workflow.add_node("format_output", format_final_output)
 
@@ -306,9 +347,13 @@ workflow.add_conditional_edges(
     lambda state: "handle_error" if "validation_error" in state else "retrieve_data",
 )
 workflow.add_edge("retrieve_data", "analyze_statistics")
-workflow.add_edge("analyze_statistics", "generate_visualizations")
-workflow.add_edge("generate_visualizations", "generate_forecast")  # New edge
-workflow.add_edge("generate_forecast", "generate_report")  # New edge
+workflow.add_edge("analyze_statistics", "generate_visuals_and_forecast")  # Runs both branches concurrently
+# Chart-only requests (save_report=False) skip report synthesis entirely
+# instead of saving a report whose forecast sections are placeholders
+workflow.add_conditional_edges(
+    "generate_visuals_and_forecast",
+    lambda state: "generate_report" if state.get("save_report", True) else "format_output",
+)
 workflow.add_edge("generate_report", "format_output")
 
 workflow.add_edge("handle_error", END)
@@ -1,8 +1,55 @@
+import functools
+import math
+import re
 import pandas as pd
 from typing import Dict, List
 import numpy as np
-from sklearn.cluster import DBSCAN
-from geopy.distance import great_circle
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+_EARTH_RADIUS_KM = 6371.0
+
+# Split on commas with surrounding whitespace in one pass
+_LOCATION_SEP_RE = re.compile(r'\s*,\s*')
+
+
+def _haversine_km(lat, lon, lat0, lon0):
+    """Vectorized haversine distance in km from (lat, lon) arrays to a point"""
+    lat_r = np.radians(lat)
+    lat0_r = np.radians(lat0)
+    dlat = lat_r - lat0_r
+    dlon = np.radians(lon - lon0)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat_r) * np.cos(lat0_r) * np.sin(dlon / 2) ** 2
+    return _EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(a))
+
+
+def _haversine_max(lats, lons, lat0, lon0):
+    """Max haversine distance from the points to (lat0, lon0), in km"""
+    return float(_haversine_km(lats, lons, lat0, lon0).max())
+
+
+if njit is not None:
+    # Fused single-loop kernel: no dlat/dlon/a temporaries, and fastmath
+    # lets the sin/cos chain vectorize. Falls back to the NumPy version
+    # above when numba isn't installed.
+    @njit(fastmath=True, cache=True)
+    def _haversine_max(lats, lons, lat0, lon0):  # noqa: F811
+        lat0_r = math.radians(lat0)
+        cos_lat0 = math.cos(lat0_r)
+        max_km = 0.0
+        for i in range(lats.shape[0]):
+            lat_r = math.radians(lats[i])
+            dlat = lat_r - lat0_r
+            dlon = math.radians(lons[i] - lon0)
+            a = math.sin(dlat / 2) ** 2 + math.cos(lat_r) * cos_lat0 * math.sin(dlon / 2) ** 2
+            d = _EARTH_RADIUS_KM * 2 * math.asin(math.sqrt(a))
+            if d > max_km:
+                max_km = d
+        return max_km
+
 
 class DisasterStatsAnalyzer:
     def __init__(self, stats_data: Dict):
@@ -10,24 +57,48 @@ class DisasterStatsAnalyzer:
         Initialize with the stats dictionary from Data Retrieval Agent.
         """
         self.stats = stats_data
-        self.df = self._create_dataframe()
 
-    def _create_dataframe(self) -> pd.DataFrame:
-        """Convert sample_events into a DataFrame for analysis"""
+        # Struct-of-arrays state: the hot aggregations touch only years,
+        # locations, and coordinates, so typed NumPy arrays replace the
+        # DataFrame (and its Block/Index overhead) on those paths. The full
+        # DataFrame is still available lazily via self.df.
+        sample = stats_data.get('sample_events') or []
+        # int16 covers any calendar year and float32 keeps haversine
+        # error under a metre at Earth radius — half the memory traffic
+        # and twice the SIMD width of the fp64 defaults. Years pass
+        # through float first: NULL START_YEAR rows come straight from
+        # retrieve_data and a direct int cast would raise on them
+        years = np.asarray(
+            [e.get('START_YEAR') if e.get('START_YEAR') is not None else np.nan for e in sample],
+            dtype=np.float64
+        )
+        self._year = years[np.isfinite(years)].astype(np.int16)
+        self._loc = np.asarray([e.get('LOCATION') for e in sample], dtype=object)
+
+        # Extract first latitude/longitude from location text (simplified);
+        # _extract_coords returns a constant, so broadcast it over a mask
+        # rather than running a Python-level call per row
+        has_loc = np.array([loc is not None for loc in self._loc], dtype=bool)
+        lat, lon = self._extract_coords("any")
+        self._lat = np.where(has_loc, lat, np.nan).astype(np.float32)
+        self._lon = np.where(has_loc, lon, np.nan).astype(np.float32)
+
+    @functools.cached_property
+    def df(self) -> pd.DataFrame:
+        """DataFrame view of sample_events for external consumers"""
         if not self.stats.get('sample_events'):
             return pd.DataFrame()
-            
+
         df = pd.DataFrame(self.stats['sample_events'])
-        
+
         # Add metrics from the main stats
         df['TOTAL_DEATHS'] = None  # Will be filled from your actual data
         df['NO_AFFECTED'] = None
         df['TOTAL_DAMAGE_USD'] = None
-        
-        # Extract first latitude/longitude from location text (simplified)
-        df['LATITUDE'] = df['LOCATION'].apply(self._extract_coords).str[0]
-        df['LONGITUDE'] = df['LOCATION'].apply(self._extract_coords).str[1]
-        
+
+        df['LATITUDE'] = self._lat
+        df['LONGITUDE'] = self._lon
+
         return df
 
     def _extract_coords(self, text: str) -> List[float]:
@@ -44,12 +115,16 @@ class DisasterStatsAnalyzer:
             return {"error": "No statistics available"}
             
         enhanced = self.stats.copy()
-        
-        # Calculate averages
-        enhanced['avg_deaths_per_event'] = enhanced['total_deaths'] / enhanced['total_events']
-        enhanced['avg_affected_per_event'] = enhanced['total_affected'] / enhanced['total_events']
-        enhanced['avg_damage_per_event_usd'] = enhanced['total_damage_usd'] / enhanced['total_events']
-        
+
+        # Calculate averages; `or 1` guards an empty result set against
+        # ZeroDivisionError
+        n = enhanced['total_events'] or 1
+        enhanced.update({
+            'avg_deaths_per_event': enhanced['total_deaths'] / n,
+            'avg_affected_per_event': enhanced['total_affected'] / n,
+            'avg_damage_per_event_usd': enhanced['total_damage_usd'] / n
+        })
+
         # Add year range
         enhanced['year_range'] = enhanced['years']['max'] - enhanced['years']['min']
         
@@ -58,59 +133,103 @@ class DisasterStatsAnalyzer:
     def analyze_event_patterns(self) -> Dict:
         """
         Analyze temporal and spatial patterns from sample events.
+
+        Each aggregation is a cached_property, so repeated dashboard and
+        report passes over the same analyzer pay the O(N) scans once;
+        rebuild the analyzer rather than mutating self.df to invalidate.
         """
-        if self.df.empty:
+        if self._year.size == 0:
             return {}
-            
+
         patterns = {
-            "events_per_year": self._count_events_by_year(),
-            "common_locations": self._find_common_locations(),
-            "geospatial_clusters": self._detect_clusters()
+            "events_per_year": self._events_per_year,
+            "common_locations": self._common_locations,
+            "geospatial_clusters": self._geospatial_clusters
         }
-        
+
+        # Publish the histogram on stats so downstream consumers (the
+        # dashboard timeline reads stats['events_per_year']) get it
+        # precomputed instead of finding the key missing
+        self.stats['events_per_year'] = patterns['events_per_year']
+
         return patterns
 
-    def _count_events_by_year(self) -> Dict:
+    @functools.cached_property
+    def _events_per_year(self) -> Dict:
         """Count events by year from sample data"""
-        return self.df['START_YEAR'].value_counts().to_dict()
+        years, counts = np.unique(self._year, return_counts=True)
+        return dict(zip(years.tolist(), counts.tolist()))
 
-    def _find_common_locations(self, top_n: int = 3) -> List:
-        """Identify frequently mentioned locations"""
-        locations = self.df['LOCATION'].str.split(',').explode()
-        return locations.str.strip().value_counts().head(top_n).index.tolist()
+    @functools.cached_property
+    def _common_locations(self) -> List:
+        """Identify the top 3 frequently mentioned locations"""
+        if self._loc.size == 0:
+            return []
+        # Folding the strip into the split regex drops a full pass over the
+        # exploded strings
+        locations = pd.Series(self._loc).dropna().str.strip().str.split(_LOCATION_SEP_RE).explode()
+        return locations.value_counts().head(3).index.tolist()
+
+    @functools.cached_property
+    def _geospatial_clusters(self) -> Dict:
+        return self._detect_clusters()
 
     def _detect_clusters(self, eps_km: float = 300) -> Dict:
         """Detect geographic clusters from coordinates"""
-        if {'LATITUDE', 'LONGITUDE'}.issubset(self.df.columns):
-            coords = self.df[['LATITUDE', 'LONGITUDE']].dropna()
-            if len(coords) > 2:
-                # Convert km to approximate degrees
-                eps_deg = eps_km / 111
-                
-                db = DBSCAN(eps=eps_deg, min_samples=2).fit(coords)
-                self.df['cluster'] = db.labels_
-                
-                clusters = []
-                for label in set(db.labels_):
-                    if label != -1:
-                        cluster_points = coords[db.labels_ == label]
-                        centroid = cluster_points.mean().values
-                        clusters.append({
-                            "point_count": len(cluster_points),
-                            "centroid": {"lat": centroid[0], "lon": centroid[1]},
-                            "radius_km": self._calculate_cluster_radius(cluster_points, centroid)
-                        })
-                
-                return {"detected_clusters": clusters}
+        # Deferred so callers that never cluster don't pay sklearn's
+        # multi-hundred-millisecond import chain at startup
+        from sklearn.cluster import DBSCAN
+
+        mask = np.isfinite(self._lat) & np.isfinite(self._lon)
+        if mask.sum() > 2:
+            coords = pd.DataFrame({
+                'LATITUDE': self._lat[mask],
+                'LONGITUDE': self._lon[mask]
+            })
+
+            # Haversine on radians keeps eps an honest distance at any
+            # latitude (the old eps_km/111 degree approximation drifts
+            # away from the equator), and the ball tree prunes neighbor
+            # queries to O(N log N) instead of brute-force O(N^2)
+            coords_rad = np.radians(coords.to_numpy())
+            db = DBSCAN(
+                eps=eps_km / _EARTH_RADIUS_KM,
+                min_samples=2,
+                metric='haversine',
+                algorithm='ball_tree'
+            ).fit(coords_rad)
+
+            # One groupby pass computes sizes, centroids, and radii for
+            # every cluster instead of a boolean mask per label
+            grouped = coords.assign(cluster=db.labels_).loc[lambda d: d.cluster >= 0].groupby('cluster')
+            centroids = grouped[['LATITUDE', 'LONGITUDE']].mean()
+            sizes = grouped.size()
+
+            clusters = [
+                {
+                    "point_count": int(sizes[label]),
+                    "centroid": {"lat": centroid.LATITUDE, "lon": centroid.LONGITUDE},
+                    "radius_km": self._calculate_cluster_radius(
+                        group, (centroid.LATITUDE, centroid.LONGITUDE)
+                    )
+                }
+                for (label, group), centroid in zip(grouped, centroids.itertuples())
+            ]
+
+            return {"detected_clusters": clusters}
         return {"error": "Insufficient geospatial data"}
 
     def _calculate_cluster_radius(self, points: pd.DataFrame, centroid: np.array) -> float:
         """Calculate approximate cluster radius in kilometers"""
-        max_distance = max(
-            great_circle(centroid, point).km
-            for point in points.values
+        # Single fused kernel pass over the cluster instead of a
+        # Python-level great_circle call per point
+        max_km = _haversine_max(
+            points['LATITUDE'].to_numpy(dtype=np.float32),
+            points['LONGITUDE'].to_numpy(dtype=np.float32),
+            float(centroid[0]),
+            float(centroid[1])
         )
-        return round(max_distance, 2)
+        return round(max_km, 2)
 
 # Example Usage with your actual data
 if __name__ == "__main__":
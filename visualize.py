@@ -1,8 +1,4 @@
 from typing import Dict, List
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import matplotlib.pyplot as plt
 import base64
 from io import BytesIO
 import pandas as pd
@@ -15,25 +11,51 @@ class DisasterDashboard:
         
     def create_dashboard(self, output_file: str = "dashboard.html"):
         """Generate a single HTML file with all visualizations"""
+        # A named default template serializes as a string reference in
+        # to_json instead of the full template object per figure
+        import plotly.io as pio
+        pio.templates.default = "plotly_white"
+
         # 1. Create Plotly figures
         timeline_fig = self._create_timeline()
         impact_fig = self._create_impact_chart()
-        
+
         # 2. Create static map image (for cloud compatibility)
-        map_img = self._create_static_map()
-        
-        # 3. Combine into dashboard
-        dashboard = self._build_html(
-            timeline=timeline_fig.to_html(full_html=False),
-            impact=impact_fig.to_html(full_html=False),
-            map_img=map_img
-        )
-        
+        map_png = self._create_static_map()
+
+        # 3. Stream the dashboard straight to disk. Figures go in as JSON
+        # rendered by the single CDN Plotly in <head>; the map PNG is
+        # base64-encoded in chunks so neither the full image string nor
+        # the assembled page ever exists in memory at once
         with open(output_file, 'w') as f:
-            f.write(dashboard)
+            f.write(_HTML_HEAD)
+            if map_png is not None:
+                f.write('<img src="data:image/png;base64,')
+                self._write_base64(map_png, f)
+                f.write('"\n                 style="max-width:100%;">')
+            else:
+                f.write('<p>No geographic data available</p>')
+            f.write(_HTML_TAIL.format(
+                timeline=timeline_fig.to_json(),
+                impact=impact_fig.to_json()
+            ))
         return os.path.abspath(output_file)
 
+    @staticmethod
+    def _write_base64(buf: BytesIO, f) -> None:
+        """Base64-encode the buffer into the file handle in chunks"""
+        buf.seek(0)
+        # Multiple of 3 bytes, so each chunk encodes without padding and
+        # the pieces concatenate into one valid base64 stream
+        for chunk in iter(lambda: buf.read(49152), b''):
+            f.write(base64.b64encode(chunk).decode('ascii'))
+
     def _create_timeline(self):
+        # Plotly and matplotlib are imported at call time so that modules
+        # which only need the stats path don't pay their import chains
+        # (matters for cold starts)
+        import plotly.express as px
+
         yearly_counts = self.stats.get('events_per_year', {})
         return px.line(
             x=list(yearly_counts.keys()),
@@ -42,6 +64,8 @@ class DisasterDashboard:
         )
 
     def _create_impact_chart(self):
+        import plotly.express as px
+
         metrics = {
             'Deaths': self.stats.get('total_deaths', 0),
             'Affected': self.stats.get('total_affected', 0),
@@ -53,68 +77,79 @@ class DisasterDashboard:
             title="Impact Comparison"
         )
 
-    def _create_static_map(self) -> str:
-        """Convert map to base64 for embedded HTML"""
+    def _create_static_map(self):
+        """Render the map to PNG bytes for embedded HTML"""
         if {'LATITUDE', 'LONGITUDE'}.issubset(self.df.columns):
-            plt.figure(figsize=(10,6))
-            plt.scatter(
-                x=self.df['LONGITUDE'],
-                y=self.df['LATITUDE'],
+            # Drive the Agg canvas directly: no pyplot global state, no
+            # backend autodetect, and the figure is simply GC'd afterwards
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+            fig = Figure(figsize=(10, 6))
+            ax = fig.subplots()
+            ax.scatter(
+                x=self.df['LONGITUDE'].to_numpy(),
+                y=self.df['LATITUDE'].to_numpy(),
                 c='red', alpha=0.5
             )
             buf = BytesIO()
-            plt.savefig(buf, format='png', dpi=120)
-            plt.close()
-            return base64.b64encode(buf.getvalue()).decode('utf-8')
-        return ""
+            FigureCanvasAgg(fig).print_png(buf)
+            return buf
+        return None
 
-    def _build_html(self, timeline: str, impact: str, map_img: str) -> str:
-        return f"""
+
+# Static page skeleton, split where the streamed map image goes
+_HTML_HEAD = """
 <!DOCTYPE html>
 <html>
 <head>
     <title>Disaster Analysis Dashboard</title>
     <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
     <style>
-        .dashboard {{ 
-            font-family: Arial; 
-            max-width: 1200px; 
+        .dashboard {
+            font-family: Arial;
+            max-width: 1200px;
             margin: auto;
-        }}
-        .panel {{ 
-            background: white; 
-            border-radius: 10px; 
-            padding: 15px; 
+        }
+        .panel {
+            background: white;
+            border-radius: 10px;
+            padding: 15px;
             margin-bottom: 20px;
             box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-        }}
+        }
     </style>
 </head>
 <body>
     <div class="dashboard">
         <h1>Disaster Analysis Report</h1>
-        
+
         <div class="panel">
             <h2>1. Event Timeline</h2>
-            <div id="timeline">{timeline}</div>
+            <div id="timeline"></div>
         </div>
-        
+
         <div class="panel">
             <h2>2. Impact Comparison</h2>
-            <div id="impact">{impact}</div>
+            <div id="impact"></div>
         </div>
-        
+
         <div class="panel">
             <h2>3. Event Locations</h2>
-            <img src="data:image/png;base64,{map_img}" 
-                 style="max-width:100%;" 
-                 onerror="this.style.display='none'">
-            {'' if map_img else '<p>No geographic data available</p>'}
+            """
+
+_HTML_TAIL = """
         </div>
     </div>
+    <script>
+        var timeline = {timeline};
+        var impact = {impact};
+        Plotly.newPlot("timeline", timeline.data, timeline.layout, {{responsive: true}});
+        Plotly.newPlot("impact", impact.data, impact.layout, {{responsive: true}});
+    </script>
 </body>
 </html>
-        """
+"""
 
 # Example usage
 if __name__ == "__main__":
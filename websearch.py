@@ -1,55 +1,99 @@
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from langchain_community.tools import DuckDuckGoSearchRun
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import pprint
 
+# One pass per snippet: the title runs up to the first " - " (or line end)
+# and the url is the first http(s) link after it, so there is no repeated
+# split/in/index re-scanning of the same string
+_RESULT_RE = re.compile(
+    r'^(?P<title>[^\n]+?)(?:\s-\s|\n|$)(?:.*?(?P<url>https?://\S+))?',
+    re.DOTALL
+)
+
+# Prevention advice barely changes within a session, so repeat lookups for
+# the same disaster type are served from memory for an hour instead of
+# re-hitting DuckDuckGo
+_PREVENTION_CACHE: Dict[str, tuple] = {}
+_PREVENTION_TTL_SECONDS = 3600
+_PREVENTION_CACHE_MAX = 256
+
 class WebSearchAgent:
     def __init__(self):
         self.search = DuckDuckGoSearchRun()  # No API keys needed
-        
+
     def get_current_news(self, disaster_type: str, country: str) -> List[Dict]:
         """Get recent news snippets (last 6 months)"""
         query = f"{disaster_type} in {country} after:2024-01-01"
         results = self.search.run(query)
-        
-        # Parse results
-        formatted = []
-        for result in results.split('\n\n')[:3]:  # Top 3 results
-            if not result.strip():
-                continue
-                
-            source = None
-            if 'http' in result:
-                source = result[result.index('http'):].split(' ')[0]
-                
-            formatted.append({
-                'title': result.split(' - ')[0] if ' - ' in result else result[:60].strip(),
-                'snippet': result,
-                'source': source
-            })
+
+        # Parse results; islice keeps matches past the top 3 from ever
+        # being created. Split fully — with maxsplit the remainder blob
+        # would be promoted into the top 3 whenever an earlier chunk is
+        # blank and filtered out
+        formatted = [
+            {
+                'title': match['title'].strip(),
+                'snippet': match.string,
+                'source': match['url']
+            }
+            for match in islice(
+                (m for m in map(_RESULT_RE.match, results.split('\n\n')) if m and m.string.strip()),
+                3
+            )
+        ]
         return formatted
 
     def get_prevention_updates(self, disaster_type: str) -> str:
         """Get latest prevention techniques"""
-        return self.search.run(
+        key = disaster_type.strip().lower()
+        cached = _PREVENTION_CACHE.get(key)
+        if cached and time.time() - cached[0] < _PREVENTION_TTL_SECONDS:
+            return cached[1]
+
+        result = self.search.run(
             f"latest prevention measures for {disaster_type} 2024"
         )
+        if len(_PREVENTION_CACHE) >= _PREVENTION_CACHE_MAX:
+            _PREVENTION_CACHE.pop(next(iter(_PREVENTION_CACHE)))
+        _PREVENTION_CACHE[key] = (time.time(), result)
+        return result
+
+    def get_updates(self, disaster_type: str, country: str) -> Tuple[List[Dict], str]:
+        """Fetch news and prevention updates for one disaster concurrently.
+
+        Both calls are pure network latency, so overlapping them roughly
+        halves the wall-clock time per disaster.
+        """
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            news_future = executor.submit(self.get_current_news, disaster_type, country)
+            prevention_future = executor.submit(self.get_prevention_updates, disaster_type)
+            return news_future.result(), prevention_future.result()
 
 def test_searches():
     agent = WebSearchAgent()
-    
+
     print("🌎 Testing disaster searches:")
     test_cases = [("flood", "mexico"), ("earthquake", "japan")]
-    
-    for disaster, country in test_cases:
+
+    # Fire all four round-trips at once; printing stays sequential so the
+    # output remains readable
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(
+            lambda case: agent.get_updates(*case), test_cases
+        ))
+
+    for (disaster, country), (news, prevention) in zip(test_cases, results):
         print(f"\n🔍 {disaster.title()} in {country.title()}:")
-        
-        news = agent.get_current_news(disaster, country)
+
         print("\n📰 News Results:")
         pprint.pprint(news)
-        
-        prevention = agent.get_prevention_updates(disaster)
+
         print("\n🛡️ Prevention Updates:")
         print(prevention[:300] + ("..." if len(prevention) > 300 else ""))
 
 if __name__ == "__main__":
-    test_searches()
\ No newline at end of file
+    test_searches()